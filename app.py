@@ -1,94 +1,384 @@
-import json
-from flask import Flask, jsonify, render_template, request, g
+# Patch sockets before anything else imports them so blocking network
+# calls (JPL fetches included) yield to other greenlets instead of
+# stalling the whole server
+try:
+    from gevent import monkey
+    monkey.patch_all()
+    from gevent.pywsgi import WSGIServer
+except ImportError:  # gevent is optional; fall back to the Flask dev server
+    WSGIServer = None
+
+import gzip
+import hashlib
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+from cachetools import TTLCache
+from flask import Flask, Response, render_template, request, send_from_directory, g
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from flask_babel import Babel
+from flask_compress import Compress
 
 app = Flask(__name__)
 
+# Compress responses on the wire; SBDB JSON repeats its field names
+# across every row, so brotli/gzip shrink it 5-10x
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 512
+Compress(app)
+
+# Shared HTTP session so repeated JPL API calls reuse keep-alive connections
+# instead of paying a fresh TCP+TLS handshake on every request
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=50,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.2)
+))
+_session.headers.update({
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip'
+})
+
+# SBDB data changes on the order of days; cache the serialized JSON bytes
+# so repeated identical queries skip the WAN round-trip entirely
+_sbdb_cache = TTLCache(maxsize=32, ttl=3600)
+
+
+def _cached_json_response(cached_bytes, gzipped=None):
+    # Strong ETag over the decoded body; the gzip variant gets a
+    # distinct suffix so the two representations never alias
+    etag = hashlib.blake2b(cached_bytes, digest_size=16).hexdigest()
+
+    # If we kept JPL's gzip bytes and the client accepts gzip, forward
+    # them as-is instead of decompressing here and re-compressing in
+    # Flask-Compress
+    if gzipped is not None and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        resp = Response(gzipped, mimetype='application/json')
+        resp.headers['Content-Encoding'] = 'gzip'
+        resp.set_etag(etag + '-gzip')
+    else:
+        resp = Response(cached_bytes, mimetype='application/json')
+        resp.set_etag(etag)
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = 'public, max-age=3600'
+    # A repeat load with a matching If-None-Match collapses to an
+    # empty-body 304
+    return resp.make_conditional(request)
+
+
+def _json_response(obj, status=200):
+    # orjson serializes straight to bytes, several times faster than
+    # jsonify's stdlib encoder
+    return Response(orjson.dumps(obj), status=status,
+                    mimetype='application/json')
+
+
+# Conditional-GET state per upstream URL+params:
+# (etag, last_modified, body, gzipped)
+_etags = {}
+
+
+def _conditional_get(api_url, params=None):
+    """GET api_url, revalidating with If-None-Match/If-Modified-Since.
+
+    Returns (body, gzipped, response): body is the decoded bytes,
+    gzipped the gzip wire bytes when the upstream sent them (else None).
+    On 304 Not Modified both come from the previous 200; on other
+    non-200 statuses body is None and the caller should inspect the
+    response.
+    """
+    key = (api_url,) + (tuple(sorted(params.items()) if params else ()))
+    headers = {}
+    cached = _etags.get(key)
+    if cached is not None:
+        etag, last_modified, _, _ = cached
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+    # stream=True exposes response.raw so we can keep the gzip bytes
+    # exactly as JPL sent them instead of letting requests decompress
+    response = _session.get(api_url, params=params, headers=headers,
+                            stream=True)
+
+    if response.status_code == 304 and cached is not None:
+        return cached[2], cached[3], response
+    if response.status_code == 200:
+        wire = response.raw.read()
+        if 'gzip' in response.headers.get('Content-Encoding', ''):
+            gzipped = wire
+            body = gzip.decompress(wire)
+        else:
+            gzipped = None
+            body = wire
+        _etags[key] = (response.headers.get('ETag'),
+                       response.headers.get('Last-Modified'),
+                       body, gzipped)
+        return body, gzipped, response
+    return None, None, response
+
 # Set default locale and supported locales
 app.config['BABEL_DEFAULT_LOCALE'] = 'en'
 app.config['BABEL_SUPPORTED_LOCALES'] = ['en', 'zh_TW']
-sbdb_data = None
+
+# Guards sbdb_data so a refresh in one request can't tear a read in
+# another (gevent's monkey-patching keeps this lock greenlet-safe)
+_sbdb_lock = threading.Lock()
+
+
+def _load_neo_snapshot():
+    """Load the last NEO snapshot written by sbdb_query, if any.
+
+    mmap lets orjson parse straight out of the page cache without an
+    intermediate read() copy.
+    """
+    try:
+        with open('neo20.json', 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return orjson.loads(memoryview(mm))
+    except (FileNotFoundError, ValueError, orjson.JSONDecodeError):
+        return None
+
+
+sbdb_data = _load_neo_snapshot()
+
+# Rendered /orrery HTML per (locale, data version); bumping the version
+# on every NEO refresh invalidates the stale renders
+sbdb_version = 0
+_render_cache = {}
+
+
+def _write_snapshot(path, payload):
+    # One compact write (the payload bytes carry no pretty-indent) into a
+    # temp file, then an atomic rename so readers never see a torn file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
 
 
 # Function to determine the user's preferred language
 def get_locale():
+    # Computed once per request: Babel's selector and the template
+    # routes both call this, and re-parsing Accept-Language each time
+    # is wasted work
+    locale = getattr(g, '_locale', None)
+    if locale is not None:
+        return locale
+
     # First, check if there is a 'lang' parameter in the URL
     lang = request.args.get('lang')
     if lang in ['en', 'zh_TW']:
+        g._locale = lang
         return lang
 
     # If no URL parameter, check user settings
     user = getattr(g, 'user', None)
     if user is not None:
+        g._locale = user.locale
         return user.locale
 
     # Fall back to the best match from the request's Accept-Language header
-    return request.accept_languages.best_match(['en', 'zh_TW'])
+    g._locale = request.accept_languages.best_match(['en', 'zh_TW']) or 'en'
+    return g._locale
 
 
 # Initialize Babel with the new selector functions
 babel = Babel(app, locale_selector=get_locale)
 
 
-# Route: Query some small bodies
-@app.route('/api/sbdb_query')
-def sbdb_query():
-    global sbdb_data
-    api_url = 'https://ssd-api.jpl.nasa.gov/sbdb_query.api'
-    params = {
-        'fields': 'full_name,epoch,e,a,q,i,om,w,ma',  # Fields to query
-        'sb-group': 'neo',  # NEOs-only (neo) or PHAs-only (pha)
-        'limit': 20  # Limit results to 20
-    }
-    # https://ssd-api.jpl.nasa.gov/sbdb_query.api?fields=full_name,epoch,e,a,q,i,om,w,ma&sb-group=neo&limit=20
+# The NEO query never varies (fixed fields, group=neo, limit=20), so
+# encode it once at import instead of rebuilding and re-URL-encoding a
+# params dict on every call
+SBDB_QUERY_URL = ('https://ssd-api.jpl.nasa.gov/sbdb_query.api'
+                  '?fields=full_name,epoch,e,a,q,i,om,w,ma'  # Fields to query
+                  '&sb-group=neo'  # NEOs-only (neo) or PHAs-only (pha)
+                  '&limit=20')  # Limit results to 20
+SBDB_QUERY_KEY = (SBDB_QUERY_URL,)
 
-    response = requests.get(api_url, params=params)
+SBDB_CAD_URL = 'https://ssd-api.jpl.nasa.gov/cad.api'
 
-    if response.status_code == 200:
-        sbdb_data = response.json()
-        # print(sbdb_data)
 
-        with open('neo20.json', 'w') as f:
-            json.dump(sbdb_data, f, indent=4)
-        
-        return jsonify(sbdb_data)
-    else:
+# Fetch the NEO list from SBDB; returns (payload_bytes, error) where
+# exactly one of the two is None
+def _fetch_neo_payload():
+    cached = _sbdb_cache.get(SBDB_QUERY_KEY)
+    if cached is not None:
+        return cached, None
+
+    return _single_flight(SBDB_QUERY_KEY, _fetch_neo_upstream)
+
+
+def _fetch_neo_upstream():
+    global sbdb_data, sbdb_version
+
+    body, gzipped, response = _conditional_get(SBDB_QUERY_URL)
+
+    if body is None:
         print(f"Error {response.status_code}: {response.text}")
-        return jsonify({"error": "Unable to fetch data", "details": response.text}), response.status_code
-    
-@app.route('/api/sbdb_CA_query')
-def sbdb_CA_query():
-    global sbdb_CA_data
-    date_min = request.args.get('date-min', '2023-10-10') 
-    date_max = request.args.get('date-max', '2025-10-10') 
-    dist_max = request.args.get('dist-max', '0.05') 
+        return None, (response.status_code, response.text)
 
-    api_url = 'https://ssd-api.jpl.nasa.gov/cad.api'
+    # Keep the parsed copy for /orrery, but snapshot and serve the
+    # upstream bytes as-is instead of decode-then-re-encode
+    parsed = orjson.loads(body)
+    # print(parsed)
+
+    with _sbdb_lock:
+        sbdb_data = parsed
+        sbdb_version += 1
+        _render_cache.clear()
+        _write_snapshot('neo20.json', body)
+
+    _sbdb_cache[SBDB_QUERY_KEY] = (body, gzipped)
+    return (body, gzipped), None
+
+
+# Fetch close-approach data; same (payload_bytes, error) contract as
+# _fetch_neo_payload
+def _fetch_CA_payload(date_min, date_max, dist_max):
+    # The close-approach query varies per request, so only the URL is
+    # hoisted; the params dict is still built here
     params = {
         'date-min': date_min,
         'date-max': date_max,
         'dist-max': dist_max
     }
-    response = requests.get(api_url, params=params)
-    
-    if response.status_code == 200:
-        data = response.json()
-        sbdb_CA_data = []
-        for item in data.get("data", []):
-            sbdb_CA_data.append({
-                "des": item[0],     
-                "cd": item[3],      
-                "dist": item[4]    
-            })
-        
-        with open('neoCA.json', 'w') as f:
-            json.dump(sbdb_CA_data, f, indent=4)
-        
-        return jsonify(sbdb_CA_data)
-    else:
-        return jsonify({"error": "Unable to fetch data", "details": response.text}), response.status_code
+    key = (SBDB_CAD_URL,) + tuple(sorted(params.items()))
+    cached = _sbdb_cache.get(key)
+    if cached is not None:
+        return cached, None
+
+    return _single_flight(key, lambda: _fetch_CA_upstream(key, params))
+
+
+def _fetch_CA_upstream(key, params):
+    body, _gzipped, response = _conditional_get(SBDB_CAD_URL, params)
+
+    if body is None:
+        return None, (response.status_code, response.text)
+
+    data = orjson.loads(body)
+    sbdb_CA_data = [
+        {"des": item[0], "cd": item[3], "dist": item[4]}
+        for item in data.get("data", [])
+    ]
+
+    # Serialize the transformed payload once and reuse the bytes for
+    # the snapshot file, the cache, and the response
+    payload = orjson.dumps(sbdb_CA_data)
+
+    _write_snapshot('neoCA.json', payload)
+    # The upstream gzip bytes cover the untransformed payload, so they
+    # can't be reused here; Flask-Compress compresses this one
+    _sbdb_cache[key] = (payload, None)
+    return (payload, None), None
+
+
+# In-flight upstream fetches by cache key, so a thundering herd on an
+# expired entry produces one JPL request instead of N (and one snapshot
+# write instead of N racing ones)
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _single_flight(key, fetch):
+    """Collapse concurrent fetches of the same key into one upstream call.
+
+    The first caller becomes the leader and runs fetch(); everyone else
+    waits, then reads the leader's result out of the TTL cache. If the
+    leader failed (nothing was cached), the waiter retries itself.
+    """
+    with _inflight_lock:
+        event = _inflight.get(key)
+        leader = event is None
+        if leader:
+            event = threading.Event()
+            _inflight[key] = event
+
+    if not leader:
+        event.wait()
+        cached = _sbdb_cache.get(key)
+        if cached is not None:
+            return cached, None
+        return fetch()
+
+    try:
+        return fetch()
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        event.set()
+
 
+def _payload_response(payload, error):
+    if payload is not None:
+        return _cached_json_response(*payload)
+    status, details = error
+    return _json_response({"error": "Unable to fetch data", "details": details},
+                          status=status)
+
+
+# Route: Query some small bodies
+@app.route('/api/sbdb_query')
+def sbdb_query():
+    return _payload_response(*_fetch_neo_payload())
+
+
+@app.route('/api/sbdb_CA_query')
+def sbdb_CA_query():
+    date_min = request.args.get('date-min', '2023-10-10')
+    date_max = request.args.get('date-max', '2025-10-10')
+    dist_max = request.args.get('dist-max', '0.05')
+
+    return _payload_response(*_fetch_CA_payload(date_min, date_max, dist_max))
+
+
+# Route: Query small bodies and close approaches in one round-trip,
+# fetching both JPL endpoints concurrently so the combined latency is
+# max() rather than sum() of the two upstream calls
+@app.route('/api/sbdb_all')
+def sbdb_all():
+    date_min = request.args.get('date-min', '2023-10-10')
+    date_max = request.args.get('date-max', '2025-10-10')
+    dist_max = request.args.get('dist-max', '0.05')
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        neo_future = executor.submit(_fetch_neo_payload)
+        ca_future = executor.submit(_fetch_CA_payload,
+                                    date_min, date_max, dist_max)
+        neo_payload, neo_error = neo_future.result()
+        ca_payload, ca_error = ca_future.result()
+
+    error = neo_error or ca_error
+    if error is not None:
+        status, details = error
+        return _json_response({"error": "Unable to fetch data", "details": details},
+                              status=status)
+
+    # Both payloads are pre-serialized bytes; splice them together
+    # instead of re-encoding
+    combined = (b'{"neo": ' + neo_payload[0] +
+                b', "close_approaches": ' + ca_payload[0] + b'}')
+    return _cached_json_response(combined)
+
+
+
+# Route: Serve textures as long-lived immutable assets. They only ever
+# change by being re-downloaded under the same name, and at up to a few
+# MB each a repeat viewer should get them from browser cache, not the
+# server; conditional=True still answers If-Modified-Since with a 304.
+@app.route('/textures/<path:name>')
+def texture(name):
+    resp = send_from_directory(os.path.join(app.static_folder, 'textures'),
+                               name, conditional=True, max_age=31536000)
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return resp
 
 
 # Route: Render the front-end HTML
@@ -97,20 +387,31 @@ def index():
     return render_template('sheet.html', locale=get_locale())
 
 
-# Route: Render the Orrery page (3D visualization)
+# Route: Render the Orrery page (3D visualization). The template output
+# only depends on the locale and the current NEO dataset, so the
+# rendered HTML is cached and a repeat hit is a dict lookup instead of
+# a Jinja run.
 @app.route('/orrery')
 def orrery():
-    global sbdb_data
+    with _sbdb_lock:
+        data = sbdb_data
+        version = sbdb_version
+
+    if data is None:
+        return _json_response({"error": "No data available"})
 
-    if sbdb_data is None:
-        try:
-            with open('neo20.json', 'r') as f:
-                sbdb_data = json.load(f)
-        except FileNotFoundError:
-            return jsonify({"error": "No data available"})
-        
-    return render_template('orrery.html', locale=get_locale(), data=sbdb_data)
+    key = (get_locale(), version)
+    html = _render_cache.get(key)
+    if html is None:
+        html = render_template('orrery.html', locale=key[0], data=data)
+        _render_cache[key] = html
+
+    return html
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    if WSGIServer is not None:
+        print('Serving on http://127.0.0.1:5000 (gevent)')
+        WSGIServer(('127.0.0.1', 5000), app).serve_forever()
+    else:
+        app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,13 @@
+# Gunicorn production config. gevent workers multiplex many in-flight
+# JPL requests per process on patched sockets, so thousands of
+# keep-alive clients don't need a thread each.
+#
+# Launch with:
+#     gunicorn -c gunicorn_conf.py app:app
+import os
+
+bind = '0.0.0.0:5000'
+worker_class = 'gevent'
+workers = os.cpu_count() * 2 + 1
+worker_connections = 1000
+keepalive = 30
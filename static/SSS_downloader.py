@@ -1,6 +1,10 @@
 import os
+import shutil
 import requests
+from requests.adapters import HTTPAdapter, Retry
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
 
 # Define the directory to save the textures
 TEXTURE_DIR = './textures'
@@ -12,6 +16,18 @@ if not os.path.exists(TEXTURE_DIR):
 # Define the URL prefix
 URL_PREFIX_1 = 'https://www.solarsystemscope.com/textures/download/'
 
+# Files up to this size are written in one shot from response.content;
+# only larger ones are streamed chunk by chunk
+STREAM_THRESHOLD = 8 * 1024 * 1024
+
+# Shared session so all downloads reuse one keep-alive connection
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=50,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.2)
+))
+
 # JS object as a Python dict with texture file names (without the prefix)
 SSS_TEXTURES = {
     'SUN': '2k_sun.jpg',
@@ -34,18 +50,38 @@ def download_image(name, filename):
         # Construct the full URL by appending the file name to the prefix
         url = URL_PREFIX_1 + filename
 
+        # Define the local file path
+        file_path = os.path.join(TEXTURE_DIR, filename)
+
+        # If we already have the file, ask the server to skip the body
+        # unless the texture changed since our copy was written
+        headers = {}
+        if os.path.exists(file_path):
+            mtime = os.path.getmtime(file_path)
+            headers['If-Modified-Since'] = formatdate(mtime, usegmt=True)
+
         # Send a GET request to the URL
-        response = requests.get(url, stream=True)
+        response = _session.get(url, stream=True, headers=headers)
+
+        # 304 Not Modified: the local copy is current, skip the download
+        if response.status_code == 304:
+            print(f'{name} texture is up to date.')
+            return file_path
+
         # Raise an error for bad status codes
         response.raise_for_status()
 
-        # Define the local file path
-        file_path = os.path.join(TEXTURE_DIR, filename)
-
-        # Write the image to the local file
-        with open(file_path, 'wb') as file:
-            for chunk in response.iter_content(chunk_size=1024):
-                file.write(chunk)
+        # The 2k textures are a couple of MB at most: one
+        # response.content write keeps the recv loop in C and skips
+        # per-chunk Python overhead. Stream only unexpectedly large files.
+        content_length = int(response.headers.get('Content-Length', 0))
+        if content_length <= STREAM_THRESHOLD:
+            with open(file_path, 'wb') as file:
+                file.write(response.content)
+        else:
+            response.raw.decode_content = True
+            with open(file_path, 'wb') as file:
+                shutil.copyfileobj(response.raw, file, length=65536)
 
         print(f'{name} texture downloaded successfully.')
 
@@ -57,12 +93,13 @@ def download_image(name, filename):
         return None
 
 
-# Function to generate the new JS object
+# Function to generate the new JS object. The paths match the Flask
+# /textures/<name> route, which serves the files with immutable caching.
 def generate_js_object(local_texture_paths):
     print("\nSSS_TEXTURES object with local paths:")
     print("const SSS_TEXTURES = {")
     for name, path in local_texture_paths.items():
-        print(f'    {name}: "../{path}",')
+        print(f'    {name}: "{path}",')
     print("};")
 
 
@@ -86,9 +123,14 @@ def main():
             local_path = os.path.join(TEXTURE_DIR, filename)
             local_texture_paths[name] = local_path.replace('./', '')
     else:
-        # Download all textures and modify JS object paths
-        for name, filename in SSS_TEXTURES.items():
-            local_path = download_image(name, filename)
+        # Download all textures in parallel (downloads are network-bound,
+        # so overlapping the waits makes total time ~ the slowest file)
+        # and modify JS object paths
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = executor.map(
+                lambda item: (item[0], download_image(*item)),
+                SSS_TEXTURES.items())
+        for name, local_path in results:
             if local_path:
                 # Use the local file path for the texture in the JS object
                 local_texture_paths[name] = local_path.replace('./', '')
@@ -177,18 +177,18 @@ const planetsData = [
 // Downloaded from https://www.solarsystemscope.com/textures/
 // These lines can be generated by SSS_downloader.py.
 const SSS_TEXTURES = {
-    SUN: "static/textures/2k_sun.jpg",
-    MERCURY: "static/textures/2k_mercury.jpg",
-    VENUS: "static/textures/2k_venus_surface.jpg",
-    EARTH: "static/textures/2k_earth_daymap.jpg",
-    MOON: "static/textures/2k_moon.jpg",
-    MARS: "static/textures/2k_mars.jpg",
-    JUPITER: "static/textures/2k_jupiter.jpg",
-    SATURN: "static/textures/2k_saturn.jpg",
-    SATURN_RING: "static/textures/2k_saturn_ring_alpha.png",
-    URANUS: "static/textures/2k_uranus.jpg",
-    NEPTUNE: "static/textures/2k_neptune.jpg",
-    MILKY_WAY: "static/textures/2k_stars_milky_way.jpg",
+    SUN: "textures/2k_sun.jpg",
+    MERCURY: "textures/2k_mercury.jpg",
+    VENUS: "textures/2k_venus_surface.jpg",
+    EARTH: "textures/2k_earth_daymap.jpg",
+    MOON: "textures/2k_moon.jpg",
+    MARS: "textures/2k_mars.jpg",
+    JUPITER: "textures/2k_jupiter.jpg",
+    SATURN: "textures/2k_saturn.jpg",
+    SATURN_RING: "textures/2k_saturn_ring_alpha.png",
+    URANUS: "textures/2k_uranus.jpg",
+    NEPTUNE: "textures/2k_neptune.jpg",
+    MILKY_WAY: "textures/2k_stars_milky_way.jpg",
 };
 
 